@@ -1,10 +1,20 @@
 import sys
 import os
-from typing import Optional, List
+from typing import Optional, List, Tuple, Callable
 import json
+import http.client
 import urllib.request
 import urllib.parse
-import urllib.error
+import base64
+import threading
+import uuid
+import time
+import random
+import hashlib
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 from aqt import mw
 from aqt.utils import showInfo, qconnect, tooltip
@@ -13,6 +23,79 @@ from aqt.qt import QAction
 from anki.notes import Note
 from anki.collection import Collection
 
+# Maximum number of OpenAI requests in flight at once
+MAX_CONCURRENT_REQUESTS = 10
+
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Idle keep-alive connections to the OpenAI API, reused across requests, with the time each was returned
+OPENAI_HOST = "api.openai.com"
+_idle_connections: List[Tuple[http.client.HTTPSConnection, float]] = []
+_connections_lock = threading.Lock()
+
+# Seconds an idle connection is kept; the server closes idle keep-alive connections on its own
+IDLE_CONNECTION_TTL = 30
+
+# Longest wait between retries of a failed request, in seconds
+MAX_RETRY_DELAY = 60
+
+# Errors raised when sending on a connection the server has already closed
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+# Number of words sent to OpenAI in a single request
+BATCH_SIZE = 20
+
+# On-disk cache of model responses; user_files is kept when the add-on is updated
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "user_files", "openai_cache.sqlite")
+
+# Instructions are sent as the system message so they form an identical prefix on every
+# request, which OpenAI's automatic prompt caching can reuse; the user message is just the words
+KANJI_SYSTEM_PROMPT = """You are a helpful assistant that provides accurate Japanese language information. Always respond with valid JSON matching the requested format.
+
+You will be given a numbered list of Japanese words in kana with their English meaning. For each word, provide the appropriate kanji spelling. If there is a standard kanji spelling for a word, provide it. If a word is typically written only in kana (like some foreign loanwords or onomatopoeia), return null for its kanji. Consider common usage and standard dictionary forms.
+
+Please respond with a JSON object in this exact format, with one entry per word, using the word's number as its index:
+{
+    "results": [
+        {
+            "index": 0,
+            "kana": "the_word_in_kana_exactly_as_given",
+            "kanji": "kanji_spelling_or_null",
+            "explanation": "brief_explanation"
+        }
+    ]
+}
+
+If there is no appropriate kanji, use null (not a string) for the kanji field."""
+
+ROMAJI_SYSTEM_PROMPT = """You are a helpful assistant that provides accurate Japanese language information. Always respond with valid JSON matching the requested format.
+
+You will be given a numbered list of Japanese kana words. Convert each to romaji (romanized Japanese). You are to use the following style guidelines:
+- Spell each kana character individually; do not use macrons for long vowels. For example, use "おう" turns into "ou", but "おお" turns into "oo". "えい" turns into "ei", but "ええ" turns into "ee".
+- The long dash (ー) in katakana should extend the preceding vowel sound (e.g., "コーヒー" becomes "koohii").
+- The small "っ" (sokuon) should be represented by doubling the consonant that follows it. Do not convert "cch" to "tch"; for example, "まっちゃ" becomes "maccha", not "matcha".
+- Always write the nasal ん as "n". Do not assimilate it to "m".
+- Add spaces after words and around particles. Also, if a word is a compound word, add proper spacing to break the word up roughly into morphemes, but be logical about it. For example, "かんこうきゃくはきれいです” should be "kankyou kyaku wa kirei desu".
+- Render the particle "は" as "wa", the particle "へ" as "e", and the particle "を" as "o" when they function as particles in a sentence. In other contexts, render them according to their standard pronunciations.
+- Capitalize the first letter of the output, but do not capitalize anything else.
+
+Please respond with a JSON object in this exact format, with one entry per word, using the word's number as its index:
+{
+    "results": [
+        {
+            "index": 0,
+            "kana": "the_word_in_kana_exactly_as_given",
+            "romaji": "romanized_text"
+        }
+    ]
+}"""
+
+# Batch API statuses for batches that haven't finished yet
+BATCH_RUNNING_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+
+NO_KANJI_MESSAGE = "No kanji generated. Make sure you have selected notes with Kana and English fields that don't already have Kanji."
+NO_ROMAJI_MESSAGE = "No romaji generated. Make sure you have selected notes with Kana field that don't already have Romanji."
+
 
 def get_openai_key() -> Optional[str]:
     """Get OpenAI API key from add-on config."""
@@ -48,118 +131,612 @@ def get_selected_notes() -> List[Note]:
     return [mw.col.get_note(nid) for nid in selected_nids]
 
 
-def call_openai_api(api_key: str, prompt: str, max_retries: int = 3):
-    """Make a JSON API call to OpenAI using urllib with retry logic."""
-    url = "https://api.openai.com/v1/chat/completions"
+class OpenAIHTTPError(Exception):
+    """An error status returned by the OpenAI API."""
+    
+    def __init__(self, status: int, message: str, retry_after: Optional[str] = None):
+        super().__init__(f"OpenAI returned HTTP {status}: {message}")
+        self.status = status
+        try:
+            self.retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            self.retry_after = None
+    
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+def new_connection() -> http.client.HTTPSConnection:
+    """Open a new connection to the OpenAI API, tunnelling through the system's HTTPS proxy if one is set."""
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(OPENAI_HOST):
+        return http.client.HTTPSConnection(OPENAI_HOST, timeout=120)
     
+    # Same proxy settings urllib.request.urlopen honours: HTTPS_PROXY or the OS configuration
+    parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    tunnel_headers = {}
+    if parts.username:
+        credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        tunnel_headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+    
+    connection = http.client.HTTPSConnection(parts.hostname, parts.port or 80, timeout=120)
+    connection.set_tunnel(OPENAI_HOST, 443, headers=tunnel_headers)
+    return connection
+
+
+def acquire_connection() -> Tuple[http.client.HTTPSConnection, bool]:
+    """Take an idle connection from the pool, or open a new one if none are free.
+
+    Returns the connection and whether it was reused from the pool.
+    """
+    now = time.monotonic()
+    with _connections_lock:
+        while _idle_connections:
+            connection, released_at = _idle_connections.pop()
+            if now - released_at < IDLE_CONNECTION_TTL:
+                return connection, True
+            connection.close()
+    return new_connection(), False
+
+
+def release_connection(connection: http.client.HTTPSConnection):
+    """Return a connection to the pool so its TLS session can be reused."""
+    with _connections_lock:
+        if len(_idle_connections) < MAX_CONCURRENT_REQUESTS:
+            _idle_connections.append((connection, time.monotonic()))
+            return
+    connection.close()
+
+
+def openai_request(api_key: str, method: str, path: str, body: Optional[bytes] = None, content_type: str = "application/json", idempotent: bool = True) -> bytes:
+    """Send a request to the OpenAI API over a pooled keep-alive connection and return the response body.
+
+    Requests that aren't idempotent use a fresh connection, so they are never resent after a pooled
+    connection turns out to be stale.
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+        "Connection": "keep-alive"
     }
+    if body is not None:
+        headers["Content-Type"] = content_type
     
-    data = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant that provides accurate Japanese language information. Always respond with valid JSON matching the requested format."},
-            {"role": "user", "content": prompt}
-        ],
+    connection, reused = acquire_connection() if idempotent else (new_connection(), False)
+    while True:
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response_body = response.read()
+            break
+        except STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused:
+                raise
+            # The server closed this pooled connection while it was idle; retry once on a fresh one
+            connection, reused = new_connection(), False
+        except (http.client.HTTPException, OSError):
+            # Don't put a broken connection back in the pool
+            connection.close()
+            raise
+    
+    if response.will_close:
+        connection.close()
+    else:
+        release_connection(connection)
+    
+    if response.status >= 400:
+        raise OpenAIHTTPError(response.status, response_body.decode('utf-8', errors='replace'), response.getheader("Retry-After"))
+    
+    return response_body
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if given, otherwise exponential backoff with jitter."""
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_DELAY)
+    return min(2 ** attempt + random.uniform(0, 1), MAX_RETRY_DELAY)
+
+
+def openai_request_with_retries(api_key: str, method: str, path: str, body: Optional[bytes] = None, content_type: str = "application/json", max_retries: int = 5, idempotent: bool = True) -> bytes:
+    """Like openai_request, but retries network errors, rate limits (429) and server errors (5xx) with backoff.
+
+    Requests that aren't idempotent, such as creating a batch, are only retried when the server can't have
+    acted on them: a rate limit or a refused connection. Otherwise a lost response could create a duplicate.
+    """
+    for attempt in range(max_retries):
+        try:
+            return openai_request(api_key, method, path, body, content_type, idempotent)
+        
+        except OpenAIHTTPError as e:
+            if not e.retryable or (not idempotent and e.status != 429) or attempt == max_retries - 1:
+                raise
+            time.sleep(retry_delay(attempt, e.retry_after))
+        except (http.client.HTTPException, OSError) as e:
+            if (not idempotent and not isinstance(e, ConnectionRefusedError)) or attempt == max_retries - 1:
+                raise Exception(f"Failed to get response from OpenAI: {e}")
+            time.sleep(retry_delay(attempt))
+
+
+def chat_completion_body(messages: List[dict]) -> dict:
+    """Build the chat completions request body for a list of messages."""
+    return {
+        "model": OPENAI_MODEL,
+        "messages": messages,
         "response_format": {"type": "json_object"},
         "temperature": 0.1
     }
+
+
+def parse_chat_completion(response_json: dict):
+    """Extract the JSON content from a chat completions response."""
+    content = response_json["choices"][0]["message"]["content"]
+    return json.loads(content)
+
+
+def call_openai_api(api_key: str, messages: List[dict], max_retries: int = 3):
+    """Make a JSON API call to OpenAI with retry logic.
+
+    Network and rate limit errors are retried with backoff by openai_request_with_retries;
+    responses that can't be parsed are requested again up to max_retries times.
+    """
+    json_data = json.dumps(chat_completion_body(messages)).encode('utf-8')
     
     for attempt in range(max_retries):
+        response_text = openai_request_with_retries(api_key, "POST", "/v1/chat/completions", json_data).decode('utf-8')
         try:
-            # Prepare the request
-            json_data = json.dumps(data).encode('utf-8')
-            request = urllib.request.Request(url, data=json_data, headers=headers)
-            
-            # Make the request
-            with urllib.request.urlopen(request) as response:
-                response_text = response.read().decode('utf-8')
-                response_json = json.loads(response_text)
-                
-                # Extract the content from OpenAI response
-                content = response_json["choices"][0]["message"]["content"]
-                return json.loads(content)
+            return parse_chat_completion(json.loads(response_text))
                 
-        except (urllib.error.URLError, json.JSONDecodeError, KeyError) as e:
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
             if attempt == max_retries - 1:
                 raise Exception(f"Failed to get response from OpenAI: {e}")
             continue
+
+
+def chunked(items: list, size: int):
+    """Yield successive lists of at most `size` items."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def build_kanji_messages(words: List[Tuple[str, str]]) -> List[dict]:
+    """Build the chat messages asking for the kanji of each (kana, english) pair."""
+    word_list = "\n".join(f'{i}. Kana: "{kana}", English meaning: "{english}"' for i, (kana, english) in enumerate(words))
+    return [
+        {"role": "system", "content": KANJI_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Provide the kanji for:\n{word_list}"}
+    ]
+
+
+def build_romaji_messages(kana_list: List[str]) -> List[dict]:
+    """Build the chat messages asking for the romaji of each kana word."""
+    word_list = "\n".join(f'{i}. "{kana}"' for i, kana in enumerate(kana_list))
+    return [
+        {"role": "system", "content": ROMAJI_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Convert to romaji:\n{word_list}"}
+    ]
+
+
+def item_kana(item) -> str:
+    """The kana of an item: either a kana word or a (kana, english) pair."""
+    return item[0] if isinstance(item, tuple) else item
+
+
+def result_matches(result: dict, kana: str) -> bool:
+    """Whether a result echoes the kana it was requested for, so it can't land on the wrong word."""
+    return str(result.get("kana") or "").strip() == kana
+
+
+def is_cacheable(result: dict, response_key: str) -> bool:
+    """Whether a result is a real answer worth caching, so an empty answer is retried on the next run.
+
+    A null kanji is a valid answer for words written only in kana.
+    """
+    value = result.get(response_key)
+    if value is None:
+        return response_key == "kanji" and response_key in result
+    return isinstance(value, str) and bool(value.strip())
+
+
+def call_openai_concurrently(api_key: str, requests: List[List[dict]], on_response: Optional[Callable[[int], None]] = None) -> list:
+    """Call OpenAI for each list of messages using a bounded thread pool.
+
+    Returns one entry per request, in order: the parsed response, or the exception raised for it.
+    If given, on_response is called from a worker thread with each request's index as it finishes.
+    """
+    def call(index):
+        try:
+            return call_openai_api(api_key, requests[index])
         except Exception as e:
-            if attempt == max_retries - 1:
-                raise e
-            continue
+            return e
+        finally:
+            if on_response:
+                on_response(index)
+    
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        return list(executor.map(call, range(len(requests))))
 
 
-def generate_kanji():
-    """Generate kanji from kana and English meaning for selected notes."""
-    api_key = get_openai_key()
-    if not api_key:
+def cache_key(messages: List[dict]) -> str:
+    """Key for a cached response to messages sent to OPENAI_MODEL."""
+    prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(f"{OPENAI_MODEL}|{prompt}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def open_cache() -> sqlite3.Connection:
+    """Open the on-disk response cache, creating it if needed."""
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    connection = sqlite3.connect(CACHE_PATH, isolation_level=None, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)")
+    return connection
+
+
+def cache_get(keys: List[str]) -> dict:
+    """Look up cached responses. Returns a dict of key to response for the keys that were found."""
+    found = {}
+    try:
+        with closing(open_cache()) as connection:
+            # Stay under SQLite's limit on the number of query parameters
+            for chunk in chunked(keys, 500):
+                placeholders = ",".join("?" * len(chunk))
+                for key, value in connection.execute(f"SELECT key, value FROM cache WHERE key IN ({placeholders})", chunk):
+                    found[key] = json.loads(value)
+    except (sqlite3.Error, json.JSONDecodeError) as e:
+        print(f"Error reading response cache: {e}")
+    return found
+
+
+def cache_put(entries: dict):
+    """Store responses in the cache, keyed by cache_key."""
+    if not entries:
         return
     
     try:
-        notes = get_selected_notes()
+        with closing(open_cache()) as connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in entries.items()]
+            )
+            connection.execute("COMMIT")
+    except sqlite3.Error as e:
+        print(f"Error writing response cache: {e}")
+
+
+def fetch_results(api_key: str, items: list, build_messages: Callable[[list], List[dict]], response_key: str, report_progress: Optional[Callable[[int], None]] = None) -> list:
+    """Get the model's result for each item, using the response cache where possible.
+
+    Returns one entry per item, in order: the result dict, or the exception that prevented getting it.
+    Items missing from the cache are sent in batches of BATCH_SIZE, one request per batch, and the
+    batches are sent concurrently. If given, report_progress is called with the number of items done so far.
+    """
+    # Cache entries are per item, so they are shared between batches and across runs
+    keys = [cache_key(build_messages([item])) for item in items]
+    cached = cache_get(keys)
+    results = [cached.get(key) for key in keys]
+    
+    # Each distinct uncached item is only requested once, even if several notes share it
+    missing = {}
+    for i, result in enumerate(results):
+        if result is None:
+            missing.setdefault(keys[i], []).append(i)
+    batches = list(chunked(list(missing), BATCH_SIZE))
+    requests = [build_messages([items[missing[key][0]] for key in batch]) for batch in batches]
+    
+    done = len(items) - sum(len(indexes) for indexes in missing.values())
+    progress_lock = threading.Lock()
+    
+    def on_response(index):
+        nonlocal done
+        with progress_lock:
+            done += sum(len(missing[key]) for key in batches[index])
+            if report_progress:
+                report_progress(done)
+    
+    if report_progress:
+        report_progress(done)
+    responses = call_openai_concurrently(api_key, requests, on_response)
+    
+    new_entries = {}
+    for batch, response in zip(batches, responses):
+        # A response that isn't the requested shape fails only its own batch
+        if not isinstance(response, Exception) and not (isinstance(response, dict) and isinstance(response.get("results"), list)):
+            response = Exception(f"Unexpected response format: {str(response)[:200]}")
         
-        if not notes:
-            showInfo("No notes selected. Please select notes in the browser first.")
-            return
+        if isinstance(response, Exception):
+            print(f"Error processing batch: {response}")
+            for key in batch:
+                for i in missing[key]:
+                    results[i] = response
+            continue
         
-        processed = 0
-        errors = 0
+        # Match results back to items by their index in the batch
+        by_index = {}
+        for result in response["results"]:
+            if isinstance(result, dict) and isinstance(result.get("index"), int):
+                by_index[result.pop("index")] = result
         
+        for index, key in enumerate(batch):
+            result = by_index.get(index)
+            kana = item_kana(items[missing[key][0]])
+            if result is None:
+                result = Exception(f"No result returned for index {index}")
+            elif not result_matches(result, kana):
+                result = Exception(f"Result for index {index} was for \"{result.get('kana')}\", not \"{kana}\"")
+            elif is_cacheable(result, response_key):
+                new_entries[key] = result
+            
+            for i in missing[key]:
+                results[i] = result
+    
+    cache_put(new_entries)
+    return results
+
+
+def save_notes(notes: List[Note]):
+    """Write updated notes to the collection in one operation rather than one write per note."""
+    if not notes:
+        return
+    
+    if hasattr(mw.col, "update_notes"):
+        mw.col.update_notes(notes)
+    else:
+        # Older Anki versions without update_notes
         for note in notes:
-            try:
-                # Check if note has required fields
-                if "Kana" not in note or "English" not in note or "Kanji" not in note:
-                    print(f"Skipping note - missing required fields. Available fields: {list(note.keys())}")
-                    continue
-                
-                kana = note["Kana"].strip()
-                english = note["English"].strip()
-                current_kanji = note["Kanji"].strip()
-                
-                # Skip if already has kanji or missing required data
-                if not kana or not english or current_kanji:
-                    continue
-                
-                # Generate kanji using OpenAI
-                prompt = f"""Given the Japanese word in kana "{kana}" with the English meaning "{english}", provide the appropriate kanji spelling. If there is a standard kanji spelling for this word, provide it. If the word is typically written only in kana (like some foreign loanwords or onomatopoeia), return null for kanji. Consider common usage and standard dictionary forms.
+            note.flush()
 
-Please respond with a JSON object in this exact format:
-{{
-    "kanji": "kanji_spelling_or_null",
-    "explanation": "brief_explanation"
-}}
 
-If there is no appropriate kanji, use null (not a string) for the kanji field."""
-                
-                response = call_openai_api(api_key, prompt)
-                
-                if response.get("kanji"):
-                    note["Kanji"] = response["kanji"]
-                    note.flush()
-                    processed += 1
-                
-            except Exception as e:
-                errors += 1
-                print(f"Error processing note: {e}")
+def apply_results(results: List[Tuple[int, dict]], field: str, response_key: str) -> Tuple[List[Note], int]:
+    """Set a field from (note ID, result) pairs. Returns the notes to save and the number of errors.
+
+    Notes are reloaded rather than reused, since they may have been edited while the requests were running.
+    """
+    updated = []
+    errors = 0
+    for nid, result in results:
+        if not result.get(response_key):
+            continue
+        
+        try:
+            note = mw.col.get_note(nid)
+            
+            # Skip notes whose field was filled in the meantime
+            if note[field].strip():
                 continue
+            
+            note[field] = result[response_key]
+            updated.append(note)
+            
+        except Exception as e:
+            errors += 1
+            print(f"Error processing note: {e}")
+            continue
+    
+    return updated, errors
+
+
+def generate_in_background(api_key: str, pending: list, build_messages: Callable[[list], List[dict]], field: str, response_key: str, errors: int, success_message: str, empty_message: str):
+    """Generate a field for (note, item) pairs off the main thread, then write results back on the main thread."""
+    items = [item for _, item in pending]
+    
+    def report_progress(done):
+        # Progress can only be updated from the main thread
+        mw.taskman.run_on_main(lambda: mw.progress.update(label=f"Processed {done} of {len(items)} notes...", value=done, max=len(items)))
+    
+    def on_done(future):
+        mw.progress.finish()
+        try:
+            results = future.result()
+        except Exception as e:
+            showInfo(f"Error: {str(e)}")
+            return
         
+        successful = []
+        failed = errors
+        for (note, _), result in zip(pending, results):
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"Error processing note: {result}")
+                continue
+            
+            successful.append((note.id, result))
+        
+        updated, apply_errors = apply_results(successful, field, response_key)
+        failed += apply_errors
+        
+        try:
+            save_notes(updated)
+        except Exception as e:
+            showInfo(f"Error saving notes: {str(e)}")
+            return
+        
+        processed = len(updated)
         if processed > 0:
-            tooltip(f"Generated kanji for {processed} notes.")
+            tooltip(success_message.format(processed))
         else:
-            showInfo("No kanji generated. Make sure you have selected notes with Kana and English fields that don't already have Kanji.")
+            showInfo(empty_message)
         
-        if errors > 0:
-            showInfo(f"Encountered {errors} errors during processing.")
+        if failed > 0:
+            showInfo(f"Encountered {failed} errors during processing.")
+    
+    mw.progress.start(max=len(items), label="Contacting OpenAI...", parent=mw)
+    mw.taskman.run_in_background(lambda: fetch_results(api_key, items, build_messages, response_key, report_progress), on_done)
+
+
+def get_field_indexes(notes: List[Note], field_names: Tuple[str, ...]) -> dict:
+    """Look up the indexes of the given fields once per note type, rather than once per note.
+
+    Returns a dict of note type ID to a tuple of field indexes, or None if the note type is missing any of the fields.
+    """
+    field_indexes = {}
+    for note in notes:
+        if note.mid in field_indexes:
+            continue
+        
+        fields = {field["name"]: i for i, field in enumerate(mw.col.models.get(note.mid)["flds"])}
+        if all(name in fields for name in field_names):
+            field_indexes[note.mid] = tuple(fields[name] for name in field_names)
+        else:
+            field_indexes[note.mid] = None
+            print(f"Skipping notes of type {note.mid} - missing required fields. Available fields: {list(fields)}")
+    
+    return field_indexes
+
+
+def get_pending_kanji_notes(notes: List[Note]) -> Tuple[list, int]:
+    """Find notes that need kanji. Returns (note, (kana, english)) pairs and the number of errors."""
+    pending = []
+    errors = 0
+    
+    field_indexes = get_field_indexes(notes, ("Kana", "English", "Kanji"))
+    
+    for note in notes:
+        try:
+            # Skip notes whose type doesn't have the required fields
+            indexes = field_indexes[note.mid]
+            if indexes is None:
+                continue
             
-    except Exception as e:
-        showInfo(f"Error: {str(e)}")
+            kana, english, current_kanji = (note.fields[i].strip() for i in indexes)
+            
+            # Skip if already has kanji or missing required data
+            if not kana or not english or current_kanji:
+                continue
+            
+            pending.append((note, (kana, english)))
+            
+        except Exception as e:
+            errors += 1
+            print(f"Error processing note: {e}")
+            continue
+    
+    return pending, errors
 
 
-def generate_romaji():
-    """Generate romaji from kana for selected notes."""
+def get_pending_romaji_notes(notes: List[Note]) -> Tuple[list, int]:
+    """Find notes that need romaji. Returns (note, kana) pairs and the number of errors."""
+    pending = []
+    errors = 0
+    
+    field_indexes = get_field_indexes(notes, ("Kana", "Romanji"))
+    
+    for note in notes:
+        try:
+            # Skip notes whose type doesn't have the required fields
+            indexes = field_indexes[note.mid]
+            if indexes is None:
+                continue
+            
+            kana, current_romaji = (note.fields[i].strip() for i in indexes)
+            
+            # Skip if no kana or already has romaji
+            if not kana or current_romaji:
+                continue
+            
+            pending.append((note, kana))
+            
+        except Exception as e:
+            errors += 1
+            print(f"Error processing note: {e}")
+            continue
+    
+    return pending, errors
+
+
+def submit_batch(api_key: str, pending: list, build_messages: Callable[[list], List[dict]]) -> Tuple[Optional[str], dict, List[Tuple[int, dict]]]:
+    """Upload one chat completions request per distinct uncached word to the OpenAI Batch API.
+
+    Returns the batch ID (None if every note was cached), a dict of cache key to the word's kana and the
+    IDs of the notes submitted under it, and (note ID, result) pairs for the notes found in the response cache.
+    """
+    keys = [cache_key(build_messages([item])) for _, item in pending]
+    cached = cache_get(keys)
+    
+    # Words that are already cached don't need to be billed again
+    cached_results = [(note.id, cached[key]) for (note, _), key in zip(pending, keys) if key in cached]
+    
+    # Notes that share a word are sent as a single request, identified by the word's cache key
+    requests = {}
+    items = {}
+    for (note, item), key in zip(pending, keys):
+        if key not in cached:
+            requests.setdefault(key, {"kana": item_kana(item), "note_ids": []})["note_ids"].append(note.id)
+            items[key] = item
+    if not requests:
+        return None, requests, cached_results
+    
+    lines = []
+    for key, item in items.items():
+        lines.append(json.dumps({
+            "custom_id": key,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": chat_completion_body(build_messages([item]))
+        }, ensure_ascii=False))
+    jsonl = "\n".join(lines).encode('utf-8')
+    
+    # Upload the requests as a multipart/form-data file
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="purpose"\r\n\r\nbatch\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="requests.jsonl"\r\n'
+        f'Content-Type: application/jsonl\r\n\r\n'
+    ).encode('utf-8') + jsonl + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    file_response = json.loads(openai_request_with_retries(api_key, "POST", "/v1/files", body, f"multipart/form-data; boundary={boundary}", idempotent=False))
+    
+    batch_request = {
+        "input_file_id": file_response["id"],
+        "endpoint": "/v1/chat/completions",
+        "completion_window": "24h"
+    }
+    batch_response = json.loads(openai_request_with_retries(api_key, "POST", "/v1/batches", json.dumps(batch_request).encode('utf-8'), idempotent=False))
+    return batch_response["id"], requests, cached_results
+
+
+def submit_batch_in_background(api_key: str, pending: list, build_messages: Callable[[list], List[dict]], field: str, response_key: str):
+    """Submit a batch off the main thread, then record it in the add-on config so results can be retrieved later."""
+    def on_done(future):
+        mw.progress.finish()
+        try:
+            batch_id, requests, cached_results = future.result()
+        except Exception as e:
+            showInfo(f"Error submitting batch: {str(e)}")
+            return
+        
+        updated, errors = apply_results(cached_results, field, response_key)
+        try:
+            save_notes(updated)
+        except Exception as e:
+            showInfo(f"Error saving notes: {str(e)}")
+            updated = []
+        
+        cached_message = f"Updated {len(updated)} notes from cached results." if cached_results else ""
+        if errors > 0:
+            cached_message += f" Encountered {errors} errors during processing."
+        
+        if batch_id is None:
+            showInfo(f"All selected notes were already cached; nothing was submitted. {cached_message}")
+            return
+        
+        config = mw.addonManager.getConfig(__name__) or {}
+        config.setdefault("pending_batches", []).append({
+            "batch_id": batch_id,
+            "field": field,
+            "response_key": response_key,
+            "requests": requests
+        })
+        mw.addonManager.writeConfig(__name__, config)
+        submitted = sum(len(request["note_ids"]) for request in requests.values())
+        showInfo(f"Submitted {submitted} notes as batch {batch_id}. Results are usually ready within 24 hours; use Tools → \"Retrieve batch results\" to apply them. {cached_message}")
+    
+    mw.progress.start(label="Submitting batch to OpenAI...", parent=mw)
+    mw.taskman.run_in_background(lambda: submit_batch(api_key, pending, build_messages), on_done)
+
+
+def generate_for_selected_notes(get_pending: Callable[[List[Note]], Tuple[list, int]], build_messages: Callable[[list], List[dict]], field: str, response_key: str, success_message: str, empty_message: str, use_batch_api: bool = False):
+    """Generate a field for the selected notes, either immediately or through the OpenAI Batch API."""
     api_key = get_openai_key()
     if not api_key:
         return
@@ -171,64 +748,194 @@ def generate_romaji():
             showInfo("No notes selected. Please select notes in the browser first.")
             return
         
-        processed = 0
-        errors = 0
+        pending, errors = get_pending(notes)
         
-        for note in notes:
-            try:
-                # Check if note has required fields
-                if "Kana" not in note or "Romanji" not in note:
-                    print(f"Skipping note - missing required fields. Available fields: {list(note.keys())}")
-                    continue
-                
-                kana = note["Kana"].strip()
-                current_romaji = note["Romanji"].strip()
-                
-                # Skip if no kana or already has romaji
-                if not kana or current_romaji:
-                    continue
-                
-                # Generate romaji using OpenAI
-                prompt = f"""Convert the Japanese kana "{kana}" to romaji (romanized Japanese). You are to use the following style guidelines:
-                - Spell each kana character individually; do not use macrons for long vowels. For example, use "おう" turns into "ou", but "おお" turns into "oo". "えい" turns into "ei", but "ええ" turns into "ee".
-                - The long dash (ー) in katakana should extend the preceding vowel sound (e.g., "コーヒー" becomes "koohii").
-                - The small "っ" (sokuon) should be represented by doubling the consonant that follows it. Do not convert "cch" to "tch"; for example, "まっちゃ" becomes "maccha", not "matcha".
-                - Always write the nasal ん as "n". Do not assimilate it to "m".
-                - Add spaces after words and around particles. Also, if a word is a compound word, add proper spacing to break the word up roughly into morphemes, but be logical about it. For example, "かんこうきゃくはきれいです” should be "kankyou kyaku wa kirei desu".
-                - Render the particle "は" as "wa", the particle "へ" as "e", and the particle "を" as "o" when they function as particles in a sentence. In other contexts, render them according to their standard pronunciations.
-                - Capitalize the first letter of the output, but do not capitalize anything else.
-
-Please respond with a JSON object in this exact format:
-{{
-    "romaji": "romanized_text"
-}}"""
-                
-                response = call_openai_api(api_key, prompt)
-                
-                if response.get("romaji"):
-                    note["Romanji"] = response["romaji"]
-                    note.flush()
-                    processed += 1
-                
-            except Exception as e:
-                errors += 1
-                print(f"Error processing note: {e}")
-                continue
+        if not pending:
+            showInfo(empty_message)
+            if errors > 0:
+                showInfo(f"Encountered {errors} errors during processing.")
+            return
         
-        if processed > 0:
-            tooltip(f"Generated romaji for {processed} notes.")
+        if use_batch_api:
+            submit_batch_in_background(api_key, pending, build_messages, field, response_key)
         else:
-            showInfo("No romaji generated. Make sure you have selected notes with Kana field that don't already have Romanji.")
-        
-        if errors > 0:
-            showInfo(f"Encountered {errors} errors during processing.")
+            generate_in_background(api_key, pending, build_messages, field, response_key, errors, success_message, empty_message)
             
     except Exception as e:
         showInfo(f"Error: {str(e)}")
 
+
+def generate_kanji(use_batch_api: bool = False):
+    """Generate kanji from kana and English meaning for selected notes."""
+    generate_for_selected_notes(
+        get_pending_kanji_notes, build_kanji_messages, "Kanji", "kanji",
+        "Generated kanji for {} notes.", NO_KANJI_MESSAGE, use_batch_api
+    )
+
+
+def generate_romaji(use_batch_api: bool = False):
+    """Generate romaji from kana for selected notes."""
+    generate_for_selected_notes(
+        get_pending_romaji_notes, build_romaji_messages, "Romanji", "romaji",
+        "Generated romaji for {} notes.", NO_ROMAJI_MESSAGE, use_batch_api
+    )
+
+
+def read_batch_output(api_key: str, file_id: str) -> Tuple[List[Tuple[str, dict]], int]:
+    """Download a batch output or error file.
+
+    Returns (custom ID, result) for each successful request, and the number of failed requests.
+    """
+    results = []
+    failed = 0
+    output = openai_request_with_retries(api_key, "GET", f"/v1/files/{file_id}/content").decode('utf-8')
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        
+        try:
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                raise Exception(entry.get("error") or response.get("body"))
+            result = dict(parse_chat_completion(response["body"])["results"][0])
+            result.pop("index", None)
+            results.append((entry["custom_id"], result))
+        except Exception as e:
+            failed += 1
+            print(f"Error in batch result: {e}")
+    
+    return results, failed
+
+
+def fetch_batch_results(api_key: str, batches: List[dict]) -> List[dict]:
+    """Check each batch's status and download the results of finished batches.
+
+    Returns one dict per batch with the batch, its status, (note ID, result) pairs and the number of failed
+    requests; results are also added to the response cache. If the batch couldn't be checked, "error" holds the reason and "gone" whether it no longer exists.
+    """
+    fetched = []
+    for batch in batches:
+        outcome = {"batch": batch, "status": None, "results": [], "failed": 0, "error": None, "gone": False}
+        fetched.append(outcome)
+        try:
+            batch_info = json.loads(openai_request_with_retries(api_key, "GET", f"/v1/batches/{batch['batch_id']}"))
+            outcome["status"] = batch_info["status"]
+            if outcome["status"] in BATCH_RUNNING_STATUSES:
+                continue
+            
+            # Expired and cancelled batches can still have partial output
+            if batch_info.get("output_file_id"):
+                results, outcome["failed"] = read_batch_output(api_key, batch_info["output_file_id"])
+                # Custom IDs are cache keys; apply each result to every note that shares the word
+                requests = batch.get("requests") or {}
+                new_entries = {}
+                for key, result in results:
+                    request = requests.get(key)
+                    if request is None or not result_matches(result, request["kana"]):
+                        outcome["failed"] += 1
+                        print(f"Error in batch result: result for \"{result.get('kana')}\" doesn't match the requested word")
+                        continue
+                    
+                    if is_cacheable(result, batch["response_key"]):
+                        new_entries[key] = result
+                    outcome["results"].extend((nid, result) for nid in request["note_ids"])
+                cache_put(new_entries)
+            if batch_info.get("error_file_id"):
+                _, failed = read_batch_output(api_key, batch_info["error_file_id"])
+                outcome["failed"] += failed
+                
+        except OpenAIHTTPError as e:
+            outcome["error"] = str(e)
+            outcome["gone"] = e.status == 404
+        except Exception as e:
+            outcome["error"] = str(e)
+    
+    return fetched
+
+
+def retrieve_batch_results():
+    """Apply the results of finished OpenAI batches to their notes."""
+    api_key = get_openai_key()
+    if not api_key:
+        return
+    
+    config = mw.addonManager.getConfig(__name__) or {}
+    batches = config.get("pending_batches") or []
+    if not batches:
+        showInfo("No batches are waiting for results.")
+        return
+    
+    def on_done(future):
+        mw.progress.finish()
+        try:
+            fetched = future.result()
+        except Exception as e:
+            showInfo(f"Error retrieving batch results: {str(e)}")
+            return
+        
+        updated = []
+        errors = 0
+        still_pending = []
+        summary = []
+        for outcome in fetched:
+            batch = outcome["batch"]
+            status = outcome["status"]
+            if outcome["error"]:
+                if outcome["gone"]:
+                    summary.append(f"Batch {batch['batch_id']} no longer exists and was removed.")
+                else:
+                    # Keep the batch so it can be checked again next time
+                    still_pending.append(batch)
+                    summary.append(f"Could not check batch {batch['batch_id']}: {outcome['error']}")
+                continue
+            
+            if status in BATCH_RUNNING_STATUSES:
+                still_pending.append(batch)
+                summary.append(f"Batch {batch['batch_id']} is still {status.replace('_', ' ')}.")
+                continue
+            
+            if status != "completed":
+                summary.append(f"Batch {batch['batch_id']} ended with status \"{status}\"; applied the {len(outcome['results'])} results it returned.")
+            
+            # Requests that failed inside the batch count as errors
+            errors += outcome["failed"]
+            
+            batch_updated, batch_errors = apply_results(outcome["results"], batch["field"], batch["response_key"])
+            updated.extend(batch_updated)
+            errors += batch_errors
+        
+        try:
+            save_notes(updated)
+        except Exception as e:
+            # Keep the batches so their results can be retrieved again
+            showInfo(f"Error saving notes: {str(e)}")
+            return
+        
+        config = mw.addonManager.getConfig(__name__) or {}
+        config["pending_batches"] = still_pending
+        mw.addonManager.writeConfig(__name__, config)
+        
+        summary.insert(0, f"Updated {len(updated)} notes from batch results.")
+        if errors > 0:
+            summary.append(f"Encountered {errors} errors during processing.")
+        showInfo("\n".join(summary))
+    
+    mw.progress.start(label="Retrieving batch results from OpenAI...", parent=mw)
+    mw.taskman.run_in_background(lambda: fetch_batch_results(api_key, batches), on_done)
+
 gen_kanji_action = QAction("Generate kanji from kana", mw)
 gen_romaji_action = QAction("Generate romaji from kana", mw)
-qconnect(gen_kanji_action.triggered, generate_kanji)
-qconnect(gen_romaji_action.triggered, generate_romaji)
+gen_kanji_batch_action = QAction("Generate kanji from kana (batch, overnight)", mw)
+gen_romaji_batch_action = QAction("Generate romaji from kana (batch, overnight)", mw)
+retrieve_batch_action = QAction("Retrieve batch results", mw)
+qconnect(gen_kanji_action.triggered, lambda: generate_kanji())
+qconnect(gen_romaji_action.triggered, lambda: generate_romaji())
+qconnect(gen_kanji_batch_action.triggered, lambda: generate_kanji(use_batch_api=True))
+qconnect(gen_romaji_batch_action.triggered, lambda: generate_romaji(use_batch_api=True))
+qconnect(retrieve_batch_action.triggered, retrieve_batch_results)
 mw.form.menuTools.addAction(gen_kanji_action)
 mw.form.menuTools.addAction(gen_romaji_action)
+mw.form.menuTools.addAction(gen_kanji_batch_action)
+mw.form.menuTools.addAction(gen_romaji_batch_action)
+mw.form.menuTools.addAction(retrieve_batch_action)